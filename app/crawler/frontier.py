@@ -0,0 +1,55 @@
+import os
+from typing import Iterator, Optional
+
+
+class AutoIdSet:
+    # множество auto_id в виде битовой карты: бит N выставлен, если id N уже встречался.
+    # id объявлений AutoRia плотные (десятки миллионов), поэтому это ~1 бит на id
+    # вместо полной строки URL в set, а add/contains - O(1)
+    __slots__ = ("_bits", "_count")
+
+    def __init__(self, data: Optional[bytes] = None):
+        self._bits = bytearray(data or b"")
+        self._count = int.from_bytes(self._bits, "little").bit_count() if self._bits else 0
+
+    def add(self, auto_id: int) -> bool:
+        # True, если id новый
+        byte, bit = divmod(auto_id, 8)
+        if byte >= len(self._bits):
+            self._bits.extend(bytes(max(byte + 1 - len(self._bits), len(self._bits) // 4)))
+        mask = 1 << bit
+        if self._bits[byte] & mask:
+            return False
+        self._bits[byte] |= mask
+        self._count += 1
+        return True
+
+    def __contains__(self, auto_id: int) -> bool:
+        byte, bit = divmod(auto_id, 8)
+        return byte < len(self._bits) and bool(self._bits[byte] & (1 << bit))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[int]:
+        for byte, value in enumerate(self._bits):
+            if not value:
+                continue
+            for bit in range(8):
+                if value & (1 << bit):
+                    yield byte * 8 + bit
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(self._bits.rstrip(b"\x00"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "AutoIdSet":
+        try:
+            with open(path, "rb") as f:
+                return cls(f.read())
+        except FileNotFoundError:
+            return cls()
@@ -1,11 +1,39 @@
 import json
 import re
+from html.parser import HTMLParser
 from typing import Optional, Dict, Any
 
 import httpx
 from bs4 import BeautifulSoup
 
 PLATE_RE = re.compile(r"\b[A-ZА-ЯІЇЄ]{2}\s?\d{4}\s?[A-ZА-ЯІЇЄ]{2}\b")
+AUTO_ID_RE = re.compile(r"_(\d+)\.html")
+
+
+# expires: разные ключи
+EXPIRES_PATTERNS = [
+    r'"expires"\s*:\s*(\d+)',
+    r'\\?"expires\\?"\s*:\s*(\d+)',       # экранированный JSON внутри строки
+    r'"expiresAt"\s*:\s*(\d+)',
+    r'\\?"expiresAt\\?"\s*:\s*(\d+)',
+    r'"expire"\s*:\s*(\d+)',
+    r'\\?"expire\\?"\s*:\s*(\d+)',
+    r'"exp"\s*:\s*(\d+)',
+    r'\\?"exp\\?"\s*:\s*(\d+)',
+]
+
+HASH_PATTERNS = [
+    r'"hash"\s*:\s*"([^"]+)"',
+    r'\\?"hash\\?"\s*:\s*\\?"([^"\\]+)\\?"',     # \"hash\":\"...\"
+    r'"token"\s*:\s*"([^"]+)"',
+    r'\\?"token\\?"\s*:\s*\\?"([^"\\]+)\\?"',
+    r'"signature"\s*:\s*"([^"]+)"',
+    r'\\?"signature\\?"\s*:\s*\\?"([^"\\]+)\\?"',
+    r'"sign"\s*:\s*"([^"]+)"',
+    r'\\?"sign\\?"\s*:\s*\\?"([^"\\]+)\\?"',
+    r'"hash"\s*:\s*([a-f0-9]{16,})',
+    r'\\?"hash\\?"\s*:\s*([a-f0-9]{16,})',
+]
 
 
 def _safe_int(x) -> Optional[int]:
@@ -23,6 +51,28 @@ def _digits_only(s: str) -> str:
     return re.sub(r"\D+", "", s or "")
 
 
+VEHICLE_MAX_SCORE = 8
+
+
+def _vehicle_score(obj: Dict[str, Any]) -> int:
+    score = 0
+    if "offers" in obj:
+        score += 3
+    if "vehicleIdentificationNumber" in obj or "vin" in obj:
+        score += 2
+    if "mileageFromOdometer" in obj:
+        score += 2
+    if "image" in obj:
+        score += 1
+    return score
+
+
+def _has_images(img_field) -> bool:
+    if isinstance(img_field, list):
+        return bool(img_field)
+    return isinstance(img_field, str) and bool(img_field.strip())
+
+
 def _pick_vehicle_jsonld(html: str) -> Dict[str, Any]:
     soup = BeautifulSoup(html, "html.parser")
     best_obj = None
@@ -44,16 +94,7 @@ def _pick_vehicle_jsonld(html: str) -> Dict[str, Any]:
             if obj.get("@type") != "Vehicle":
                 continue
 
-            score = 0
-            if "offers" in obj:
-                score += 3
-            if "vehicleIdentificationNumber" in obj or "vin" in obj:
-                score += 2
-            if "mileageFromOdometer" in obj:
-                score += 2
-            if "image" in obj:
-                score += 1
-
+            score = _vehicle_score(obj)
             if score > best_score:
                 best_score = score
                 best_obj = obj
@@ -127,6 +168,13 @@ def _extract_price_usd(vehicle: Dict[str, Any], html: str) -> Optional[int]:
     return None
 
 
+def auto_id_from_url(url: str) -> Optional[int]:
+    m = AUTO_ID_RE.search(url or "")
+    if m:
+        return int(m.group(1))
+    return None
+
+
 def _extract_auto_id(html: str, vehicle: Dict[str, Any]) -> Optional[int]:
     m = re.search(r'"autoId"\s*:\s*(\d+)', html)
     if m:
@@ -134,9 +182,7 @@ def _extract_auto_id(html: str, vehicle: Dict[str, Any]) -> Optional[int]:
 
     vid = vehicle.get("@id") or vehicle.get("url")
     if isinstance(vid, str):
-        m2 = re.search(r'_(\d+)\.html', vid)
-        if m2:
-            return int(m2.group(1))
+        return auto_id_from_url(vid)
 
     return None
 
@@ -145,36 +191,13 @@ def _extract_expires_hash(html: str) -> tuple[Optional[str], Optional[str]]:
     expires = None
     hash_ = None
 
-    # 1) expires: разные ключи
-    expires_patterns = [
-        r'"expires"\s*:\s*(\d+)',
-        r'\\?"expires\\?"\s*:\s*(\d+)',       # экранированный JSON внутри строки
-        r'"expiresAt"\s*:\s*(\d+)',
-        r'\\?"expiresAt\\?"\s*:\s*(\d+)',
-        r'"expire"\s*:\s*(\d+)',
-        r'\\?"expire\\?"\s*:\s*(\d+)',
-        r'"exp"\s*:\s*(\d+)',
-        r'\\?"exp\\?"\s*:\s*(\d+)',
-    ]
-    for pat in expires_patterns:
+    for pat in EXPIRES_PATTERNS:
         m = re.search(pat, html)
         if m:
             expires = m.group(1)
             break
 
-    hash_patterns = [
-        r'"hash"\s*:\s*"([^"]+)"',
-        r'\\?"hash\\?"\s*:\s*\\?"([^"\\]+)\\?"',     # \"hash\":\"...\"
-        r'"token"\s*:\s*"([^"]+)"',
-        r'\\?"token\\?"\s*:\s*\\?"([^"\\]+)\\?"',
-        r'"signature"\s*:\s*"([^"]+)"',
-        r'\\?"signature\\?"\s*:\s*\\?"([^"\\]+)\\?"',
-        r'"sign"\s*:\s*"([^"]+)"',
-        r'\\?"sign\\?"\s*:\s*\\?"([^"\\]+)\\?"',
-        r'"hash"\s*:\s*([a-f0-9]{16,})',
-        r'\\?"hash\\?"\s*:\s*([a-f0-9]{16,})',
-    ]
-    for pat in hash_patterns:
+    for pat in HASH_PATTERNS:
         m = re.search(pat, html, flags=re.I)
         if m:
             hash_ = m.group(1)
@@ -200,6 +223,78 @@ def _extract_expires_hash(html: str) -> tuple[Optional[str], Optional[str]]:
     return expires, hash_
 
 
+class CardStreamParser(HTMLParser):
+    # инкрементальный детектор: получает куски HTML по мере загрузки и отмечает,
+    # какие поля для parse_card уже встретились, чтобы можно было прервать загрузку
+    _TAIL = 512
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.found: set[str] = set()
+        self._in_ldjson = False
+        self._ldjson_buf: list[str] = []
+        self._tail = ""
+
+    @property
+    def complete(self) -> bool:
+        return {"og:title", "og:image", "vehicle", "username", "auto_id", "expires", "hash"} <= self.found
+
+    def feed(self, data: str) -> None:
+        super().feed(data)
+        # регэкспы гоняем только по новому куску + хвост предыдущего
+        window = self._tail + data
+        self._tail = window[-self._TAIL:]
+
+        # для username/expires/hash - только первый по приоритету паттерн: экстракторы
+        # берут первый совпавший паттерн по всей странице, и только совпадение первого
+        # в префиксе гарантирует, что на полной странице будет выбрано то же значение
+        checks = (
+            ("username", [r'\["userName"\s*,\s*"([^"]+)"\]'], 0),
+            ("auto_id", [r'"autoId"\s*:\s*\d+'], 0),
+            ("expires", EXPIRES_PATTERNS[:1], 0),
+            ("hash", HASH_PATTERNS[:1], re.I),
+        )
+        for key, patterns, flags in checks:
+            if key in self.found:
+                continue
+            if any(re.search(p, window, flags=flags) for p in patterns):
+                self.found.add(key)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "meta":
+            prop = attrs.get("property")
+            if prop in ("og:title", "og:image") and attrs.get("content"):
+                self.found.add(prop)
+        elif tag == "script" and attrs.get("type") == "application/ld+json":
+            self._in_ldjson = True
+            self._ldjson_buf = []
+
+    def handle_data(self, data):
+        if self._in_ldjson:
+            self._ldjson_buf.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "script" and self._in_ldjson:
+            self._in_ldjson = False
+            try:
+                data = json.loads("".join(self._ldjson_buf).strip())
+            except Exception:
+                return
+            # _pick_vehicle_jsonld берёт первый блок с максимальным score, поэтому
+            # останавливаться можно только на таком блоке; непустой image к тому же
+            # гарантирует, что images_count возьмётся из JSON-LD, а не из обрезанного DOM
+            items = data if isinstance(data, list) else [data]
+            for obj in items:
+                if (
+                    isinstance(obj, dict)
+                    and obj.get("@type") == "Vehicle"
+                    and _vehicle_score(obj) == VEHICLE_MAX_SCORE
+                    and _has_images(obj.get("image"))
+                ):
+                    self.found.add("vehicle")
+
+
 async def _fetch_phone_number(
     client: httpx.AsyncClient,
     car_url: str,
@@ -1,9 +1,23 @@
+import re
 from typing import Optional
+from urllib.parse import urlsplit
 import asyncio
-from typing import List
+from typing import Any, Dict, List
 import httpx
 from bs4 import BeautifulSoup
 
+from app.crawler.frontier import AutoIdSet
+from app.crawler.parser import AUTO_ID_RE, CardStreamParser, _safe_int, auto_id_from_url
+from app.logger import get_logger
+from app.settings import (
+    SCRAPE_CONCURRENCY,
+    SCRAPE_MAX_SPLIT_DEPTH,
+    SCRAPE_PARTITION_MAX_PAGES,
+    SCRAPE_PRICE_CEILING,
+    SCRAPE_PRICE_BANDS,
+    SCRAPE_STREAM_MAX_BYTES,
+)
+
 BASE = "https://auto.ria.com"
 SEARCH = "https://auto.ria.com/uk/car/used/"
 
@@ -12,6 +26,11 @@ HEADERS = {
     "Accept-Language": "uk-UA,uk;q=0.9,en;q=0.8",
 }
 
+# ценовая полоса [lo, hi); hi=None - без верхней границы
+PriceBand = tuple[int, int | None]
+
+log = get_logger("scraper")
+
 async def get_html(client: httpx.AsyncClient, url: str, retries: int = 3) -> str:
     last_err = None
     for attempt in range(1, retries + 1):
@@ -30,50 +49,266 @@ async def get_html(client: httpx.AsyncClient, url: str, retries: int = 3) -> str
     raise last_err
 
 
-async def scrape_list_pages(limit_pages: int | None = None) -> List[str]:
+async def get_card_html_streamed(
+    client: httpx.AsyncClient,
+    url: str,
+    early_stop: bool = True,
+    max_bytes: int = SCRAPE_STREAM_MAX_BYTES,
+) -> str:
+    # читаем карточку кусками и обрываем загрузку, как только CardStreamParser
+    # нашёл все поля; после max_bytes (или при early_stop=False) детектор не используется
+    # и страница дочитывается целиком. HTTP-статус пробрасываем как есть,
+    # при ошибке транспорта/декодирования - обычная загрузка через get_html
+    detector: CardStreamParser | None = CardStreamParser() if early_stop else None
+    chunks: list[str] = []
+    try:
+        async with client.stream("GET", url, headers=HEADERS) as r:
+            r.raise_for_status()
+            async for chunk in r.aiter_text():
+                chunks.append(chunk)
+                if detector is None:
+                    continue
+                detector.feed(chunk)
+                if detector.complete:
+                    break
+                if r.num_bytes_downloaded >= max_bytes:
+                    detector = None
+    except httpx.HTTPStatusError:
+        raise
+    except (httpx.HTTPError, UnicodeDecodeError):
+        return await get_html(client, url)
+
+    return "".join(chunks)
+
+
+def _parse_odometer(text: str) -> Optional[int]:
+    text = (text or "").lower().replace(" ", "").replace("\xa0", "")
+    if "безпробігу" in text or "безпробега" in text:
+        return 0
+    m = re.search(r"\d+(?:[.,]\d+)?", text)
+    if not m:
+        return None
+    value = float(m.group(0).replace(",", "."))
+    # "95 тис. км" -> 95000
+    if "тис" in text or "тыс" in text:
+        value *= 1000
+    return int(value)
+
+
+def _parse_summary(a) -> Dict[str, Any]:
+    card = a.find_parent("section", class_="ticket-item") or a.parent
+
+    title = (a.get("title") or a.get_text(" ", strip=True) or "").strip() or None
+
+    price_usd = None
+    price_el = card.select_one("[data-currency='USD']")
+    if price_el:
+        price_usd = _safe_int(price_el.get_text(strip=True))
+
+    odometer = None
+    race_el = card.select_one(".js-race")
+    if race_el:
+        odometer = _parse_odometer(race_el.get_text(" ", strip=True))
+
+    return {"title": title, "price_usd": price_usd, "odometer": odometer}
+
+
+def _normalize_url(href: str) -> Optional[str]:
+    # канонический вид: BASE + путь, без query/fragment - чтобы варианты URL одного
+    # объявления совпадали с url в БД
+    path = urlsplit(href).path
+    if not path.startswith("/uk/auto_") or "/newauto/" in path or not AUTO_ID_RE.search(path):
+        return None
+    return BASE + path
+
+
+def _extract_listings(soup: BeautifulSoup, seen: AutoIdSet, listings: List[Dict[str, Any]]) -> None:
+    # дедуп по auto_id, а не по строке href: варианты URL одного объявления схлопываются
+    for a in soup.select("a.address"):
+        url = _normalize_url(a.get("href") or "")
+        if not url:
+            continue
+        auto_id = auto_id_from_url(url)
+        if auto_id is None or not seen.add(auto_id):
+            continue
+        listings.append({"url": url, "auto_id": auto_id, **_parse_summary(a)})
+
+
+def _extract_max_page(soup: BeautifulSoup) -> int:
+    max_page = 1
+    for a in soup.select("a.page-link"):
+        try:
+            max_page = max(max_page, int(a.get_text(strip=True)))
+        except Exception:
+            pass
+    return max_page
+
+
+def _band_url(band: PriceBand, page: int = 1) -> str:
+    lo, hi = band
+    params = [f"price.USD.gte={lo}"]
+    if hi is not None:
+        params.append(f"price.USD.lte={hi - 1}")
+    if page > 1:
+        params.append(f"page={page}")
+    return f"{SEARCH}?{'&'.join(params)}"
+
+
+def _split_band(band: PriceBand) -> list[PriceBand]:
+    lo, hi = band
+    if hi is None:
+        mid = min(max(lo * 2, lo + 1000), SCRAPE_PRICE_CEILING)
+        if mid <= lo:
+            return [band]
+        return [(lo, mid), (mid, None)]
+    if hi - lo <= 1:
+        return [band]
+    mid = (lo + hi) // 2
+    return [(lo, mid), (mid, hi)]
+
+
+def _initial_bands(bounds: list[int]) -> list[PriceBand]:
+    bounds = sorted(set(bounds)) or [0]
+    bands: list[PriceBand] = list(zip(bounds, bounds[1:]))
+    bands.append((bounds[-1], None))
+    return bands
+
+
+async def _scrape_pages_flat(client: httpx.AsyncClient, limit_pages: int | None) -> List[Dict[str, Any]]:
+    first_html = await get_html(client, SEARCH)
+    soup = BeautifulSoup(first_html, "html.parser")
+
+    seen = AutoIdSet()
+    listings: List[Dict[str, Any]] = []
+    _extract_listings(soup, seen, listings)
+
+    max_page = _extract_max_page(soup)
+    if limit_pages is not None:
+        max_page = min(max_page, limit_pages)
+
+    for page in range(2, max_page + 1):
+        page_url = f"{SEARCH}?page={page}"
+        html = await get_html(client, page_url)
+        soup = BeautifulSoup(html, "html.parser")
+        _extract_listings(soup, seen, listings)
+
+    return listings
+
+
+async def _scrape_band(
+    client: httpx.AsyncClient,
+    sem: asyncio.Semaphore,
+    band: PriceBand,
+    parent_pages: int | None,
+    depth: int,
+    limit_pages: int | None,
+    seen: AutoIdSet,
+    listings: List[Dict[str, Any]],
+) -> list[tuple[PriceBand, int]]:
+    # возвращает подполосы (вместе с числом страниц родителя), если полосу нужно разделить
+    async with sem:
+        html = await get_html(client, _band_url(band))
+    soup = BeautifulSoup(html, "html.parser")
+    _extract_listings(soup, seen, listings)
+
+    max_page = _extract_max_page(soup)
+    extra = {"stage": "list", "url": _band_url(band), "pages": max_page, "depth": depth}
+    if max_page >= SCRAPE_PARTITION_MAX_PAGES:
+        parts = _split_band(band) if depth < SCRAPE_MAX_SPLIT_DEPTH else [band]
+        if parent_pages is not None and max_page >= parent_pages:
+            # деление не уменьшило выдачу - дальше делить бессмысленно
+            log.warning(
+                "split of band %s did not reduce pages (%d >= parent %d), listings past pagination cap are skipped",
+                band, max_page, parent_pages, extra=extra,
+            )
+        elif len(parts) > 1:
+            log.info("split %s -> %s (pages=%d)", band, parts, max_page, extra=extra)
+            return [(part, max_page) for part in parts]
+        else:
+            # дальше делить нельзя - объявления за пределами пагинации будут потеряны
+            log.warning(
+                "band %s cannot be split further (pages=%d, depth=%d), listings past pagination cap are skipped",
+                band, max_page, depth, extra=extra,
+            )
+
+    if limit_pages is not None:
+        max_page = min(max_page, limit_pages)
+
+    async def fetch_page(page: int) -> None:
+        page_url = _band_url(band, page)
+        try:
+            async with sem:
+                page_html = await get_html(client, page_url)
+        except Exception as e:
+            log.error(
+                "list page failed",
+                extra={"stage": "list", "url": page_url, "error_class": type(e).__name__, "error": str(e)},
+            )
+            return
+        _extract_listings(BeautifulSoup(page_html, "html.parser"), seen, listings)
+
+    await asyncio.gather(*(fetch_page(page) for page in range(2, max_page + 1)))
+    return []
+
+
+async def _price_filter_applied(client: httpx.AsyncClient, band: PriceBand) -> bool:
+    # если выдача с фильтром по цене не меньше выдачи без фильтра - сайт фильтр игнорирует
+    total_pages = _extract_max_page(BeautifulSoup(await get_html(client, SEARCH), "html.parser"))
+    band_pages = _extract_max_page(BeautifulSoup(await get_html(client, _band_url(band)), "html.parser"))
+    if total_pages > 1 and band_pages >= total_pages:
+        log.warning(
+            "price filter looks ignored (band %s pages=%d, unfiltered pages=%d)",
+            band, band_pages, total_pages,
+            extra={"stage": "list", "url": _band_url(band), "pages": band_pages, "total_pages": total_pages},
+        )
+        return False
+    return True
+
+
+async def _scrape_pages_partitioned(client: httpx.AsyncClient, limit_pages: int | None) -> List[Dict[str, Any]]:
+    bands = _initial_bands(SCRAPE_PRICE_BANDS)
+    if not await _price_filter_applied(client, bands[0]):
+        return await _scrape_pages_flat(client, limit_pages)
+
+    sem = asyncio.Semaphore(SCRAPE_CONCURRENCY)
+    seen = AutoIdSet()
+    listings: List[Dict[str, Any]] = []
+
+    depth = 0
+    pending: list[tuple[PriceBand, int | None]] = [(band, None) for band in bands]
+    while pending:
+        results = await asyncio.gather(
+            *(
+                _scrape_band(client, sem, band, parent_pages, depth, limit_pages, seen, listings)
+                for band, parent_pages in pending
+            ),
+            return_exceptions=True,
+        )
+        next_pending: list[tuple[PriceBand, int | None]] = []
+        for (band, _), res in zip(pending, results):
+            if isinstance(res, Exception):
+                log.error(
+                    "partition failed",
+                    extra={"stage": "list", "url": _band_url(band), "error_class": type(res).__name__, "error": str(res)},
+                )
+                continue
+            next_pending.extend(res)
+        pending = next_pending
+        depth += 1
+
+    return listings
+
+
+async def scrape_list_pages(limit_pages: int | None = None, partitioned: bool = False) -> List[Dict[str, Any]]:
+    # каждый элемент: {"url", "auto_id", "title", "price_usd", "odometer"} с карточки выдачи
     async with httpx.AsyncClient(
         headers=HEADERS,
         follow_redirects=True,
         timeout=30,
     ) as client:
-        first_html = await get_html(client, SEARCH)
-        soup = BeautifulSoup(first_html, "html.parser")
-
-        urls = set()
-        for a in soup.select("a.address"):
-            href = a.get("href")
-            if href:
-                urls.add(href)
-
-        max_page = 1
-        for a in soup.select("a.page-link"):
-            try:
-                max_page = max(max_page, int(a.get_text(strip=True)))
-            except Exception:
-                pass
-
-        if limit_pages is not None:
-            max_page = min(max_page, limit_pages)
-
-        for page in range(2, max_page + 1):
-            page_url = f"{SEARCH}?page={page}"
-            html = await get_html(client, page_url)
-            soup = BeautifulSoup(html, "html.parser")
-            for a in soup.select("a.address"):
-                href = a.get("href")
-                if href:
-                    urls.add(href)
-
-        result = []
-        for u in urls:
-            if u.startswith("http"):
-                result.append(u)
-            else:
-                result.append(BASE + u)
-
-
-        result = [u for u in result if "/uk/auto_" in u and "/newauto/" not in u]
-        return result
+        if partitioned:
+            return await _scrape_pages_partitioned(client, limit_pages)
+        return await _scrape_pages_flat(client, limit_pages)
 
 
 async def fetch_phone_number(
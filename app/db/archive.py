@@ -0,0 +1,106 @@
+import re
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.db.models import CarListingArchive, ListingFields
+
+ARCHIVE_TABLE = CarListingArchive.__tablename__
+PARTITION_RE = re.compile(rf"^{ARCHIVE_TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+_COLUMNS = ", ".join(["id"] + [c for c in ListingFields.__annotations__])
+
+
+def _month_start(dt: datetime) -> datetime:
+    dt = dt.astimezone(timezone.utc)
+    return datetime(dt.year, dt.month, 1, tzinfo=timezone.utc)
+
+
+def _add_months(dt: datetime, n: int) -> datetime:
+    idx = dt.year * 12 + dt.month - 1 + n
+    return datetime(idx // 12, idx % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def _partition_name(month: datetime) -> str:
+    return f"{ARCHIVE_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+async def ensure_listing_schema(conn: AsyncConnection) -> None:
+    # create_all не добавляет колонки в уже существующую таблицу
+    await conn.execute(text(
+        "ALTER TABLE car_listings "
+        "ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMPTZ NOT NULL DEFAULT now()"
+    ))
+    await conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_car_listings_last_seen_at ON car_listings (last_seen_at)"
+    ))
+    await conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS ix_car_listings_archive_url ON {ARCHIVE_TABLE} (url)"
+    ))
+
+
+async def ensure_archive_partitions(conn: AsyncConnection, start: datetime, end: datetime) -> None:
+    # месячные партиции, покрывающие [start, end]
+    month = _month_start(start)
+    last = _month_start(end)
+    while month <= last:
+        nxt = _add_months(month, 1)
+        await conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {_partition_name(month)} "
+            f"PARTITION OF {ARCHIVE_TABLE} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{nxt.isoformat()}')"
+        ))
+        month = nxt
+
+
+async def archive_stale_listings(conn: AsyncConnection, days: int) -> int:
+    res = await conn.execute(
+        text(
+            "SELECT min(last_seen_at), max(last_seen_at) FROM car_listings "
+            "WHERE last_seen_at < now() - make_interval(days => :days)"
+        ),
+        {"days": days},
+    )
+    oldest, newest = res.one()
+    if oldest is None:
+        return 0
+
+    await ensure_archive_partitions(conn, oldest, newest)
+
+    res = await conn.execute(
+        text(
+            "WITH moved AS ("
+            "  DELETE FROM car_listings "
+            "  WHERE last_seen_at < now() - make_interval(days => :days) "
+            f"  RETURNING {_COLUMNS}"
+            ") "
+            f"INSERT INTO {ARCHIVE_TABLE} ({_COLUMNS}) SELECT {_COLUMNS} FROM moved"
+        ),
+        {"days": days},
+    )
+    return res.rowcount
+
+
+async def drop_expired_archive_partitions(conn: AsyncConnection, months: int) -> list[str]:
+    if months <= 0:
+        return []
+
+    cutoff = _add_months(_month_start(datetime.now(timezone.utc)), -months)
+    res = await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        f"WHERE p.relname = '{ARCHIVE_TABLE}'"
+    ))
+
+    dropped = []
+    for (name,) in res:
+        m = PARTITION_RE.match(name)
+        if not m:
+            continue
+        month = datetime(int(m.group(1)), int(m.group(2)), 1, tzinfo=timezone.utc)
+        if _add_months(month, 1) <= cutoff:
+            await conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+    return dropped
@@ -1,14 +1,92 @@
+from typing import Any, AsyncIterator, Dict, Iterable
+
+from sqlalchemy import delete, func, select, update
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import CarListing
+from app.crawler.parser import auto_id_from_url
+from app.db.models import CarListing, CarListingArchive
+
+
+# поля, которые parse_card может не найти на обрезанной потоковой загрузке:
+# None для них не должен затирать уже сохранённое значение
+KEEP_ON_NULL = ("car_number", "images_count")
+
+
+async def _restore_from_archive(session: AsyncSession, url: str, data: dict) -> dict:
+    # объявление снова появилось в выдаче: забираем его из архива, чтобы url не был
+    # в двух таблицах сразу, и сохраняем исходный datetime_found
+    res = await session.execute(
+        delete(CarListingArchive)
+        .where(CarListingArchive.url == url)
+        .returning(
+            CarListingArchive.datetime_found,
+            CarListingArchive.last_seen_at,
+            *(getattr(CarListingArchive, k) for k in KEEP_ON_NULL),
+        )
+    )
+    rows = sorted(res.all(), key=lambda r: r.last_seen_at)
+    if not rows:
+        return data
+
+    restored = {**data, "datetime_found": min(r.datetime_found for r in rows)}
+    for key in KEEP_ON_NULL:
+        if restored.get(key) is None:
+            restored[key] = getattr(rows[-1], key)
+    return restored
 
 
 async def save_car(session: AsyncSession, url: str, **data):
-    stmt = insert(CarListing).values(url=url, **data)
+    insert_data = await _restore_from_archive(session, url, data)
+    stmt = insert(CarListing).values(url=url, **insert_data)
+    update_data = {k: v for k, v in data.items() if v is not None or k not in KEEP_ON_NULL}
     stmt = stmt.on_conflict_do_update(
         index_elements=["url"],
-        set_=data
+        set_={**update_data, "last_seen_at": func.now()}
     )
     await session.execute(stmt)
     await session.commit()
+
+
+async def get_listing_snapshots(
+    session: AsyncSession,
+    urls: Iterable[str],
+    chunk_size: int = 1000,
+) -> Dict[str, Dict[str, Any]]:
+    urls = list(urls)
+    snapshots: Dict[str, Dict[str, Any]] = {}
+    for i in range(0, len(urls), chunk_size):
+        chunk = urls[i:i + chunk_size]
+        stmt = select(
+            CarListing.url,
+            CarListing.title,
+            CarListing.price_usd,
+            CarListing.odometer,
+        ).where(CarListing.url.in_(chunk))
+        for row in await session.execute(stmt):
+            snapshots[row.url] = {
+                "title": row.title,
+                "price_usd": row.price_usd,
+                "odometer": row.odometer,
+            }
+    return snapshots
+
+
+async def touch_listings(session: AsyncSession, urls: Iterable[str], chunk_size: int = 1000) -> None:
+    # объявление есть в выдаче, но детальную страницу не качали - продлеваем last_seen_at,
+    # чтобы оно не ушло в архив
+    urls = list(urls)
+    for i in range(0, len(urls), chunk_size):
+        chunk = urls[i:i + chunk_size]
+        await session.execute(
+            update(CarListing).where(CarListing.url.in_(chunk)).values(last_seen_at=func.now())
+        )
+    await session.commit()
+
+
+async def iter_listing_auto_ids(session: AsyncSession) -> AsyncIterator[int]:
+    result = await session.stream_scalars(select(CarListing.url).execution_options(yield_per=10000))
+    async for url in result:
+        auto_id = auto_id_from_url(url)
+        if auto_id is not None:
+            yield auto_id
@@ -1,15 +1,10 @@
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import String, Integer, BigInteger, DateTime, func, UniqueConstraint
+from sqlalchemy import String, Integer, BigInteger, DateTime, func, UniqueConstraint, Index
 
 class Base(DeclarativeBase):
     pass
 
-class CarListing(Base):
-    __tablename__ = "car_listings"
-    __table_args__ = (UniqueConstraint("url", name="uq_car_listings_url"),)
-
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
-
+class ListingFields:
     url: Mapped[str] = mapped_column(String, nullable=False)
     title: Mapped[str | None] = mapped_column(String, nullable=True)
     price_usd: Mapped[int | None] = mapped_column(Integer, nullable=True)
@@ -24,4 +19,27 @@ class CarListing(Base):
     car_number: Mapped[str | None] = mapped_column(String, nullable=True)
     car_vin: Mapped[str | None] = mapped_column(String, nullable=True)
 
-    datetime_found: Mapped[object] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
\ No newline at end of file
+    datetime_found: Mapped[object] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_seen_at: Mapped[object] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+# "горячая" таблица: только объявления, которые видели за последние HOT_RETENTION_DAYS
+class CarListing(ListingFields, Base):
+    __tablename__ = "car_listings"
+    __table_args__ = (
+        UniqueConstraint("url", name="uq_car_listings_url"),
+        Index("ix_car_listings_last_seen_at", "last_seen_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+# "холодный" архив, партиционирован по месяцу last_seen_at (партиции - app/db/archive.py)
+class CarListingArchive(ListingFields, Base):
+    __tablename__ = "car_listings_archive"
+    __table_args__ = (
+        Index("ix_car_listings_archive_url", "url"),
+        {"postgresql_partition_by": "RANGE (last_seen_at)"},
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    last_seen_at: Mapped[object] = mapped_column(DateTime(timezone=True), primary_key=True)
+    archived_at: Mapped[object] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -2,7 +2,15 @@ import os
 import subprocess
 from datetime import datetime
 
-from app.settings import DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
+from app.db.archive import ARCHIVE_TABLE, archive_stale_listings, drop_expired_archive_partitions
+from app.db.database import engine
+from app.logger import get_logger
+from app.settings import (
+    DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD,
+    ARCHIVE_RETENTION_MONTHS, DUMP_INCLUDE_ARCHIVE, HOT_RETENTION_DAYS,
+)
+
+log = get_logger("jobs")
 
 DUMPS_DIR = "/app/dumps"
 
@@ -15,9 +23,21 @@ def dump_db():
     env["PGPASSWORD"] = DB_PASSWORD
 
 
+    exclude = "" if DUMP_INCLUDE_ARCHIVE else f" --exclude-table-data='{ARCHIVE_TABLE}*'"
     cmd = (
-        f"pg_dump -h {DB_HOST} -p {DB_PORT} -U {DB_USER} -d {DB_NAME} | gzip > {out_file}"
+        f"pg_dump -h {DB_HOST} -p {DB_PORT} -U {DB_USER} -d {DB_NAME}{exclude} | gzip > {out_file}"
     )
     subprocess.run(cmd, shell=True, check=True, env=env)
 
-    print(f"[dump_db] OK -> {out_file}")
\ No newline at end of file
+    log.info("OK -> %s", out_file, extra={"stage": "dump", "file": out_file})
+
+
+async def archive_listings():
+    async with engine.begin() as conn:
+        moved = await archive_stale_listings(conn, HOT_RETENTION_DAYS)
+        dropped = await drop_expired_archive_partitions(conn, ARCHIVE_RETENTION_MONTHS)
+
+    log.info(
+        "archived=%d dropped_partitions=%s", moved, dropped,
+        extra={"stage": "archive", "archived": moved, "dropped_partitions": dropped},
+    )
@@ -13,4 +13,32 @@ DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT
 
 TZ = os.getenv("TZ", "Europe/Kyiv")
 SCRAPE_TIME = os.getenv("SCRAPE_TIME", "12:00")
-DUMP_TIME = os.getenv("DUMP_TIME", "12:05")
\ No newline at end of file
+DUMP_TIME = os.getenv("DUMP_TIME", "12:05")
+ARCHIVE_TIME = os.getenv("ARCHIVE_TIME", "03:00")
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# доля успешных per-URL сообщений, которые попадают в лог (0.0 - 1.0)
+LOG_SUCCESS_SAMPLE_RATE = float(os.getenv("LOG_SUCCESS_SAMPLE_RATE", "1.0"))
+
+# партиционированный обход поиска: стартовые ценовые полосы (USD), последняя открыта сверху
+SCRAPE_PRICE_BANDS = [int(x) for x in os.getenv("SCRAPE_PRICE_BANDS", "0,3000,6000,10000,15000,25000,50000").split(",") if x.strip()]
+# если у полосы страниц не меньше этого числа - она делится пополам
+SCRAPE_PARTITION_MAX_PAGES = int(os.getenv("SCRAPE_PARTITION_MAX_PAGES", "100"))
+# ограничители деления: максимальная глубина и потолок цены для открытой верхней полосы
+SCRAPE_MAX_SPLIT_DEPTH = int(os.getenv("SCRAPE_MAX_SPLIT_DEPTH", "10"))
+SCRAPE_PRICE_CEILING = int(os.getenv("SCRAPE_PRICE_CEILING", "1000000"))
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "8"))
+# пропускать детальные страницы, если цена/пробег/заголовок в выдаче не изменились
+SCRAPE_FAST_PATH = os.getenv("SCRAPE_FAST_PATH", "1").lower() in ("1", "true", "yes")
+# потоковая загрузка карточек с ранней остановкой; лимит в байтах на одну карточку
+SCRAPE_STREAM_CARDS = os.getenv("SCRAPE_STREAM_CARDS", "1").lower() in ("1", "true", "yes")
+SCRAPE_STREAM_MAX_BYTES = int(os.getenv("SCRAPE_STREAM_MAX_BYTES", str(2 * 1024 * 1024)))
+
+# объявления, не встречавшиеся HOT_RETENTION_DAYS дней, переносятся в car_listings_archive
+HOT_RETENTION_DAYS = int(os.getenv("HOT_RETENTION_DAYS", "30"))
+# сколько месяцев хранить партиции архива (0 - хранить всегда)
+ARCHIVE_RETENTION_MONTHS = int(os.getenv("ARCHIVE_RETENTION_MONTHS", "12"))
+# включать ли данные архива в ежедневный дамп
+DUMP_INCLUDE_ARCHIVE = os.getenv("DUMP_INCLUDE_ARCHIVE", "0").lower() in ("1", "true", "yes")
+# персистентный фронтир: битовая карта auto_id, уже сохранённых в БД
+FRONTIER_PATH = os.getenv("FRONTIER_PATH", "/app/data/auto_ids.bin")
@@ -1,18 +1,32 @@
 import asyncio
+import time
 
 import httpx
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from sqlalchemy import text
 
+from app.crawler.frontier import AutoIdSet
 from app.crawler.parser import parse_card
-from app.crawler.scraper import get_html, scrape_list_pages
+from app.crawler.scraper import get_card_html_streamed, get_html, scrape_list_pages
 from app.crawler.phone_playwright import get_phone_via_playwright
-from app.db.crud import save_car
+from app.db.archive import ensure_listing_schema
+from app.db.crud import get_listing_snapshots, iter_listing_auto_ids, save_car, touch_listings
 from app.db.database import AsyncSessionLocal, engine
 from app.db.models import Base
-from app.jobs import dump_db
-from app.settings import DUMP_TIME, SCRAPE_TIME, TZ
+from app.jobs import archive_listings, dump_db
+from app.logger import get_logger, setup_logging
+from app.settings import (
+    ARCHIVE_TIME,
+    DUMP_TIME,
+    FRONTIER_PATH,
+    SCRAPE_FAST_PATH,
+    SCRAPE_STREAM_CARDS,
+    SCRAPE_TIME,
+    TZ,
+)
+
+log = get_logger("scrape")
 
 
 def _hhmm_to_cron(time_str: str) -> tuple[int, int]:
@@ -23,52 +37,152 @@ def _hhmm_to_cron(time_str: str) -> tuple[int, int]:
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await ensure_listing_schema(conn)
         res = await conn.execute(text("SELECT 1"))
-        print("DB OK:", res.scalar_one())
+        log.info("DB OK: %s", res.scalar_one(), extra={"stage": "init_db"})
+
+
+def _ms_since(t0: float) -> int:
+    return int((time.perf_counter() - t0) * 1000)
+
+
+def _summary_changed(summary: dict, stored: dict | None) -> bool:
+    # решение принимается только по цене и пробегу: заголовок карточки в выдаче
+    # и og:title детальной страницы формируются по-разному, сравнивать их ненадёжно
+    if stored is None:
+        return True
+
+    # в выдаче нет ни цены, ни пробега - сравнивать не с чем
+    if all(summary.get(k) is None for k in ("price_usd", "odometer")):
+        return True
 
+    for key in ("price_usd", "odometer"):
+        if summary.get(key) is not None and summary[key] != stored.get(key):
+            return True
 
-async def scrape_job(limit_pages: int | None = 1):
-    urls = await scrape_list_pages(limit_pages=limit_pages)
+    return False
+
+
+def _title_differs(summary: dict, stored: dict) -> bool:
+    # только для статистики: сколько пропущенных объявлений отличаются лишь заголовком
+    title = (summary.get("title") or "").lower()
+    return bool(title) and title not in (stored.get("title") or "").lower()
+
+
+async def scrape_job(limit_pages: int | None = 1, partitioned: bool = False):
+    setup_logging()
+    t_list = time.perf_counter()
+    listings = await scrape_list_pages(limit_pages=limit_pages, partitioned=partitioned)
+    log.info(
+        "list pages scraped: %d urls", len(listings),
+        extra={"stage": "list", "duration_ms": _ms_since(t_list), "count": len(listings)},
+    )
 
     with_phone = 0
     without_phone = 0
     errors = 0
+    unchanged = 0
+
+    known = AutoIdSet.load(FRONTIER_PATH)
 
     async with AsyncSessionLocal() as session:
-        async with httpx.AsyncClient(
-            headers={"User-Agent": "Mozilla/5.0"},
-            follow_redirects=True,
-            timeout=httpx.Timeout(20.0, connect=10.0),
-        ) as client:
-            for url in urls:
-                try:
-                    html = await get_html(client, url)
-                    data = await parse_card(client, url, html)
-
-                    # --- fallback через Playwright ---
-                    if not data.get("phone_number"):
-                        phone = await get_phone_via_playwright(url)
-                        if phone:
-                            data["phone_number"] = phone
-                            with_phone += 1
-                            print(f"[phone via playwright] {url}")
+        if not known:
+            # фронтир пуст (первый запуск или потерян ./data) - восстанавливаем из БД,
+            # иначе fast path посчитал бы все объявления новыми
+            async for auto_id in iter_listing_auto_ids(session):
+                known.add(auto_id)
+            log.info("frontier seeded from db: %d ids", len(known), extra={"stage": "frontier", "count": len(known)})
+
+        try:
+            if SCRAPE_FAST_PATH:
+                # id, которых нет во фронтире, заведомо новые - за ними в БД не ходим
+                stored = await get_listing_snapshots(
+                    session, (x["url"] for x in listings if x["auto_id"] in known)
+                )
+                to_fetch = [x for x in listings if _summary_changed(x, stored.get(x["url"]))]
+                unchanged = len(listings) - len(to_fetch)
+                fetch_urls = {x["url"] for x in to_fetch}
+                title_only = sum(
+                    1 for x in listings
+                    if x["url"] in stored and x["url"] not in fetch_urls and _title_differs(x, stored[x["url"]])
+                )
+                log.info(
+                    "fast path: %d unchanged, %d of them differ only by title", unchanged, title_only,
+                    extra={"stage": "fast_path", "unchanged": unchanged, "title_only": title_only},
+                )
+                await touch_listings(session, set(stored) - fetch_urls)
+            else:
+                to_fetch = listings
+
+            async with httpx.AsyncClient(
+                headers={"User-Agent": "Mozilla/5.0"},
+                follow_redirects=True,
+                timeout=httpx.Timeout(20.0, connect=10.0),
+            ) as client:
+                for item in to_fetch:
+                    url = item["url"]
+                    t0 = time.perf_counter()
+                    stage = "fetch"
+                    try:
+                        if SCRAPE_STREAM_CARDS:
+                            # новые объявления читаем целиком: номерной знак ищется по всему
+                            # тексту страницы и на обрезанной странице был бы потерян
+                            html = await get_card_html_streamed(
+                                client, url, early_stop=item["auto_id"] in known
+                            )
+                        else:
+                            html = await get_html(client, url)
+                        stage = "parse"
+                        data = await parse_card(client, url, html)
+
+                        # --- fallback через Playwright ---
+                        if not data.get("phone_number"):
+                            stage = "phone_playwright"
+                            phone = await get_phone_via_playwright(url)
+                            if phone:
+                                data["phone_number"] = phone
+                                with_phone += 1
+                                log.info("phone via playwright", extra={"url": url, "stage": stage, "sampled": True})
+                            else:
+                                without_phone += 1
+                                log.info("no phone", extra={"url": url, "stage": stage, "sampled": True})
                         else:
-                            without_phone += 1
-                            print(f"[no phone] {url}")
-                    else:
-                        with_phone += 1
-
-                    await save_car(session, url=url, **data)
-                    print(f"[scraped] {url}")
-
-                except Exception as e:
-                    errors += 1
-                    print(f"[error] {url} -> {e}")
-
-    print(
-        f"SUMMARY: with_phone={with_phone} "
-        f"without_phone={without_phone} "
-        f"errors={errors}"
+                            with_phone += 1
+
+                        stage = "save"
+                        await save_car(session, url=url, **data)
+                        known.add(item["auto_id"])
+                        log.info(
+                            "scraped",
+                            extra={"url": url, "stage": "done", "duration_ms": _ms_since(t0), "sampled": True},
+                        )
+
+                    except Exception as e:
+                        errors += 1
+                        log.error(
+                            "scrape failed",
+                            extra={
+                                "url": url,
+                                "stage": stage,
+                                "duration_ms": _ms_since(t0),
+                                "error_class": type(e).__name__,
+                                "error": str(e),
+                            },
+                        )
+        finally:
+            # сохраняем и при падении посреди прогона, чтобы не терять уже собранные id
+            known.save(FRONTIER_PATH)
+
+    log.info(
+        "SUMMARY: with_phone=%d without_phone=%d unchanged=%d errors=%d",
+        with_phone, without_phone, unchanged, errors,
+        extra={
+            "stage": "summary",
+            "with_phone": with_phone,
+            "without_phone": without_phone,
+            "unchanged": unchanged,
+            "errors": errors,
+        },
     )
 
 
@@ -85,11 +199,21 @@ def start_scheduler():
         misfire_grace_time=60,
     )
 
+    # ---- archive job ----
+    archive_h, archive_m = _hhmm_to_cron(ARCHIVE_TIME)
+    scheduler.add_job(
+        archive_listings,
+        CronTrigger(hour=archive_h, minute=archive_m, timezone=TZ),
+        id="archive_listings",
+        replace_existing=True,
+        misfire_grace_time=60,
+    )
+
     # ---- scrape job ----
     scrape_h, scrape_m = _hhmm_to_cron(SCRAPE_TIME)
 
     def schedule_scrape():
-        asyncio.create_task(scrape_job(limit_pages=None))
+        asyncio.create_task(scrape_job(limit_pages=None, partitioned=True))
 
     scheduler.add_job(
         schedule_scrape,
@@ -100,14 +224,15 @@ def start_scheduler():
     )
 
     scheduler.start()
-    print(
-        f"Scheduler started. TZ={TZ}, "
-        f"SCRAPE_TIME={SCRAPE_TIME}, "
-        f"DUMP_TIME={DUMP_TIME}"
+    log.info(
+        "Scheduler started. TZ=%s, SCRAPE_TIME=%s, DUMP_TIME=%s, ARCHIVE_TIME=%s",
+        TZ, SCRAPE_TIME, DUMP_TIME, ARCHIVE_TIME,
+        extra={"stage": "scheduler"},
     )
 
 
 async def main():
+    setup_logging()
     await init_db()
     start_scheduler()
     while True: